@@ -9,12 +9,25 @@ FLOW:
 3) Main app (Scientist / Student / Public)
 """
 
+import asyncio
 import os
-
+import tempfile
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import imageio.v2 as imageio
+import numpy as np
+import pandas as pd
+import requests
+import requests_cache
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import ee
 import geemap.foliumap as geemap
-import geemap as geemap_core
+from geopy.adapters import RequestsAdapter
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderServiceError, GeocoderTimedOut
 
@@ -25,40 +38,61 @@ from geopy.exc import GeocoderServiceError, GeocoderTimedOut
 
 BACKGROUND_URL = (
     "https://eoimages.gsfc.nasa.gov/images/imagerecords/73000/73909/"
-    "world.topo.bathy.200412.3x5400x2700.jpg"
+    "world.topo.bathy.200412.3x5400x2700.jpg?v=1"
 )
 
 
+WALLPAPER_CSS = f"""
+<style>
+.stApp {{
+    background-image:
+        linear-gradient(rgba(0,0,0,0.70), rgba(0,0,0,0.92)),
+        url("{BACKGROUND_URL}");
+    background-size: cover;
+    background-position: center;
+    background-attachment: fixed;
+    color: #f5f5f5;
+}}
+</style>
+"""
+
+
 def apply_wallpaper():
     """
     Set a dark overlay + NASA Earth wallpaper as the full app background.
+
+    Streamlit drops any element a rerun doesn't emit, so the <style> tag is
+    written every run. The versioned URL gives the browser a stable cache key
+    for the large NASA JPEG.
     """
-    css = f"""
-    <style>
-    .stApp {{
-        background-image:
-            linear-gradient(rgba(0,0,0,0.70), rgba(0,0,0,0.92)),
-            url("{BACKGROUND_URL}");
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-        color: #f5f5f5;
-    }}
-    </style>
-    """
-    st.markdown(css, unsafe_allow_html=True)
+    st.markdown(WALLPAPER_CSS, unsafe_allow_html=True)
 
 
 # --------------------------
 # Google Earth Engine initialization
 # --------------------------
+EE_HIGH_VOLUME_URL = "https://earthengine-highvolume.googleapis.com"
+
+
+@st.cache_resource
+def _initialize_ee():
+    """
+    Initialize Earth Engine against the high-volume endpoint, which is meant
+    for many small concurrent requests like our reduceRegion calls.
+
+    Cached, so it runs once per process; a failure isn't cached and is
+    retried on the next run.
+    """
+    # Initialize with your Google Cloud project
+    ee.Initialize(project='terratime-autocomplete', opt_url=EE_HIGH_VOLUME_URL)
+
+
 def initialize_earth_engine():
     """
-    Initialize Earth Engine using geemap.ee_initialize().
+    Make sure Earth Engine is initialized, or stop with setup instructions.
     """
     try:
-        # Initialize with your Google Cloud project
-        ee.Initialize(project='terratime-autocomplete')
+        _initialize_ee()
     except Exception as e:
         st.error(
             "Could not initialize Google Earth Engine.\n\n"
@@ -70,61 +104,219 @@ def initialize_earth_engine():
         st.stop()
 
 
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Shared worker pool for the blocking Earth Engine stages of an audit
+    (stats, NDVI series, map), so they can run side by side.
+    """
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_resource
+def get_timelapse_executor() -> ThreadPoolExecutor:
+    """
+    Separate pool for timelapse jobs, so a slow or timed-out timelapse never
+    holds a worker the stats/map stages need.
+    """
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def with_script_ctx(fn):
+    """
+    Bind the calling script thread's ScriptRunContext to `fn`.
+
+    Our cached helpers (st.cache_data / st.cache_resource) expect a script
+    context; pool threads don't have one, so jobs submitted to an executor
+    attach the submitting script's context before running.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+
+    return run
+
+
 # --------------------------
 # OpenStreetMap / Nominatim helpers
 # --------------------------
+
+# Coordinates are rounded to 4 decimals (~11 m) everywhere they enter the app,
+# so repeat audits of a place hit the same imagery/series cache entries.
+COORD_DECIMALS = 4
+
+def _throttle_sends(session, min_interval_s: float):
+    """
+    Space out real HTTP sends on `session` by at least `min_interval_s`.
+
+    The throttle wraps the session's mounted transport adapters. A
+    CachedSession only reaches those on a cache miss, so disk-cache hits
+    return immediately instead of waiting behind the rate limit.
+    """
+    lock = threading.Lock()
+    last_send = [0.0]
+
+    for transport in session.adapters.values():
+        def throttled_send(request, *args, _send=transport.send, **kwargs):
+            with lock:
+                wait = last_send[0] + min_interval_s - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                last_send[0] = time.monotonic()
+            return _send(request, *args, **kwargs)
+
+        transport.send = throttled_send
+
+
+# One shared geocoder so every lookup goes through the same rate limit
+# (Nominatim's usage policy allows at most 1 request per second).
+# Its RequestsAdapter owns a single pooled requests.Session, so the TLS
+# connection to Nominatim is kept alive between lookups.
+# The session is created while requests_cache is enabled, which makes it a
+# SQLite-backed CachedSession: repeat lookups survive app restarts, and
+# other libraries' requests (Earth Engine, geemap) are left uncached.
+# The rate limit sits below the cache, on actual network sends only.
+GEOCODE_CACHE_PATH = os.path.join(".cache", "geopy")
+os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH), exist_ok=True)
+
+with requests_cache.enabled(
+    GEOCODE_CACHE_PATH,
+    backend="sqlite",
+    expire_after=86400 * 7,
+):
+    _GEOLOCATOR = Nominatim(
+        user_agent="terra_time_app",
+        adapter_factory=partial(RequestsAdapter, pool_connections=4, pool_maxsize=4),
+    )
+_throttle_sends(_GEOLOCATOR.adapter.session, min_interval_s=1.0)
+
+# Errors are raised (not swallowed) so the cached lookups below don't store
+# them; transport retries are left to the RequestsAdapter.
+_geocode = _GEOLOCATOR.geocode
+
+
+def _normalize_query(query: str) -> str:
+    """
+    Normalize a free-text location query so equivalent spellings share a cache entry.
+    """
+    return " ".join(query.lower().split())
+
+
+def _location_to_dict(location) -> dict:
+    """
+    Convert a geopy Location into a small picklable dict for st.cache_data.
+
+    Coordinates are snapped to the COORD_DECIMALS grid so the same place always
+    produces the same downstream cache keys.
+    """
+    return {
+        "lat": round(location.latitude, COORD_DECIMALS),
+        "lon": round(location.longitude, COORD_DECIMALS),
+        "display_name": location.address,
+    }
+
+
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def _cached_osm_suggestions(query: str, max_results: int):
+    """
+    Nominatim lookup behind the cache. Errors are left to propagate so
+    st.cache_data doesn't cache a transient failure as "no results".
+    """
+    results = _geocode(
+        query,
+        exactly_one=False,
+        limit=max_results,
+    )
+    if not results:
+        return []
+    return [_location_to_dict(r) for r in results]
+
+
 def get_osm_suggestions(query: str, max_results: int = 5):
     """
     Use OpenStreetMap Nominatim to get multiple matching locations for a query.
+
+    Returns a list of dicts with "lat", "lon" and "display_name". Results are
+    cached for a day, keyed on the normalized query.
     """
     if not query or len(query.strip()) < 3:
         return []
 
-    geolocator = Nominatim(user_agent="terra_time_app_suggestions")
     try:
-        results = geolocator.geocode(
-            query,
-            exactly_one=False,
-            limit=max_results,
-        )
-        if not results:
-            return []
-        return results
+        return _cached_osm_suggestions(_normalize_query(query), max_results)
     except (GeocoderTimedOut, GeocoderServiceError):
         return []
     except Exception:
         return []
 
 
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def _cached_geocode(address: str):
+    """
+    Nominatim lookup behind the cache. Errors are left to propagate so
+    st.cache_data doesn't cache a transient failure as "not found".
+    """
+    location = _geocode(address)
+    if location is None:
+        return None
+    return _location_to_dict(location)
+
+
 def geocode_location(address: str):
     """
-    Geocode a text address into (latitude, longitude) using OSM Nominatim.
+    Geocode a text address into a dict with "lat", "lon" and "display_name"
+    using OSM Nominatim. Results are cached for a day, keyed on the
+    normalized address.
     """
-    geolocator = Nominatim(user_agent="terra_time_app_geocode")
     try:
-        location = geolocator.geocode(address)
+        return _cached_geocode(_normalize_query(address))
     except (GeocoderTimedOut, GeocoderServiceError):
         return None
     except Exception:
         return None
 
-    return location
-
 
 # --------------------------
 # NDVI + imagery helpers
 # --------------------------
+
+# Radius above which single synchronous Earth Engine requests tend to time out.
+LARGE_ROI_KM = 20
+
+
 def create_roi(lon: float, lat: float, buffer_km: float = 5.0):
     """
     Create an Earth Engine geometry: a circular buffer around the point
     with the given radius in kilometers.
+
+    The centre is snapped to the COORD_DECIMALS grid (~11 m) so ROIs for the
+    same place are identical.
     """
+    lon = round(lon, COORD_DECIMALS)
+    lat = round(lat, COORD_DECIMALS)
     point = ee.Geometry.Point([lon, lat])
     roi = point.buffer(buffer_km * 1000)  # circle
     return roi
 
 
-def get_ndvi_image(year: int, roi: ee.Geometry) -> ee.Image:
+def mask_landsat_clouds(img: ee.Image) -> ee.Image:
+    """
+    Per-pixel cloud mask for Landsat Collection 2 Level 2 + reflectance scaling.
+
+    Drops pixels flagged in QA_PIXEL as dilated cloud (bit 1), cirrus (bit 2),
+    cloud (bit 3) or cloud shadow (bit 4), and converts the SR_B* bands to
+    surface reflectance (scale 0.0000275, offset -0.2).
+    """
+    qa = img.select("QA_PIXEL")
+    cloud_bits = (1 << 1) | (1 << 2) | (1 << 3) | (1 << 4)
+    mask = qa.bitwiseAnd(cloud_bits).eq(0)
+    optical = img.select("SR_B.").multiply(0.0000275).add(-0.2)
+    return optical.updateMask(mask)
+
+
+def _ndvi_composite(year: int, roi: ee.Geometry) -> ee.Image:
     """
     Median composite Landsat 8 Surface Reflectance NDVI for a given year.
     """
@@ -135,7 +327,7 @@ def get_ndvi_image(year: int, roi: ee.Geometry) -> ee.Image:
         ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
         .filterDate(start, end)
         .filterBounds(roi)
-        .filter(ee.Filter.lt("CLOUD_COVER", 60))
+        .map(mask_landsat_clouds)
     )
 
     composite = collection.median()
@@ -143,75 +335,252 @@ def get_ndvi_image(year: int, roi: ee.Geometry) -> ee.Image:
     return ndvi
 
 
-def compute_mean_ndvi(ndvi_image: ee.Image, roi: ee.Geometry):
+@st.cache_resource(max_entries=128, show_spinner=False)
+def get_ndvi_image(year: int, lon: float, lat: float, buffer_km: float) -> ee.Image:
+    """
+    Memoized NDVI composite for (year, ROI centre, radius).
+
+    ee.Geometry isn't hashable, so the ROI is rebuilt from its parameters and
+    the graph is reused across reruns and sessions.
+    """
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+    return _ndvi_composite(year, roi)
+
+
+def _compute_mean_ndvi_tiled(
+    ndvi_image: ee.Image,
+    roi: ee.Geometry,
+    bands: list[str],
+    tile_size_m: int = 10_000,
+):
+    """
+    Pixel-count-weighted mean NDVI over a large ROI, reduced tile by tile.
+
+    The ROI is split on a 10 km grid and each tile is reduced concurrently,
+    which avoids the single-request timeouts we hit at large radii. The tile
+    geometries are fetched once, so each tile request carries a concrete
+    geometry instead of re-evaluating the grid on the server.
     """
-    Reduce NDVI image over ROI to get a mean NDVI value.
+    grid = roi.coveringGrid("EPSG:3857", tile_size_m).map(
+        lambda f: f.intersection(roi, ee.ErrorMargin(1))
+    )
+    tiles = [ee.Geometry(f["geometry"]) for f in grid.getInfo()["features"]]
+
+    reducer = ee.Reducer.mean().combine(ee.Reducer.count(), sharedInputs=True)
+
+    def reduce_tile(tile):
+        return ndvi_image.reduceRegion(
+            reducer=reducer,
+            geometry=tile,
+            scale=30,
+            maxPixels=1e13,
+        ).getInfo()
+
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        results = list(ex.map(reduce_tile, tiles))
+
+    means = {}
+    for band in bands:
+        weighted_sum = 0.0
+        total_count = 0
+        for r in results:
+            mean_v = r.get(f"{band}_mean")
+            count = r.get(f"{band}_count") or 0
+            if mean_v is not None and count:
+                weighted_sum += mean_v * count
+                total_count += count
+        means[band] = weighted_sum / total_count if total_count else None
+    return means
+
+
+def compute_mean_ndvi(
+    ndvi_image: ee.Image,
+    roi: ee.Geometry,
+    tiled: bool = False,
+    bands: list[str] | None = None,
+):
+    """
+    Reduce a (possibly multi-band) NDVI image over ROI in a single request.
+
+    With `tiled=True` (large ROIs) the reduction is split across grid tiles
+    instead; see _compute_mean_ndvi_tiled. That path needs the image's band
+    names in `bands`.
+
+    Returns a dict of band name -> mean value (None where no valid pixels),
+    or None if the request fails.
     """
+    if tiled:
+        try:
+            return _compute_mean_ndvi_tiled(ndvi_image, roi, bands)
+        except Exception:
+            return None
+
     stats = ndvi_image.reduceRegion(
         reducer=ee.Reducer.mean(),
         geometry=roi,
         scale=30,
         maxPixels=1e13,
     )
-    value = stats.get("NDVI")
-
-    if value is None:
-        return None
 
     try:
-        return float(value.getInfo())
+        values = stats.getInfo()
     except Exception:
         return None
 
+    return {
+        band: float(v) if v is not None else None
+        for band, v in values.items()
+    }
+
 
-def compute_ndvi_series(roi: ee.Geometry, start_year: int = 2014, end_year: int = 2024):
+def ndvi_to_green_score(ndvi):
+    """
+    Map NDVI (-1..1) to the 0–100 Green Score. Works on scalars and arrays.
+    """
+    return (ndvi + 1) / 2 * 100
+
+
+def compute_ndvi_series(
+    roi: ee.Geometry,
+    start_year: int = 2014,
+    end_year: int = 2024,
+    tiled: bool = False,
+):
     """
     Compute mean NDVI for each year in [start_year, end_year] over the same ROI.
+
+    The yearly NDVI composites are stacked as bands of one image and reduced
+    together, so the whole series is one reducer and one getInfo() round-trip
+    (or one per tile with `tiled=True`, as in compute_mean_ndvi).
+
+    Raises RuntimeError if the reduction fails, so callers that cache the
+    result don't cache the failure.
     """
     years = list(range(start_year, end_year + 1))
-    values = []
-    for y in years:
-        try:
-            ndvi_img = get_ndvi_image(y, roi)
-            mean_v = compute_mean_ndvi(ndvi_img, roi)
-        except Exception:
-            mean_v = None
-        values.append(mean_v)
+
+    stack = ee.ImageCollection.fromImages(
+        [_ndvi_composite(y, roi).rename(f"y{y}") for y in years]
+    ).toBands()
+    bands = [f"{i}_y{y}" for i, y in enumerate(years)]  # toBands() naming
+
+    means = compute_mean_ndvi(stack, roi, tiled=tiled, bands=bands)
+    if means is None:
+        raise RuntimeError("NDVI series reduction failed")
+
+    by_year = {int(band.rsplit("_y", 1)[1]): v for band, v in means.items()}
+    values = [by_year.get(y) for y in years]
     return years, values
 
 
-def create_timelapse_gif(roi: ee.Geometry, out_gif: str = "terrtime_timelapse.gif"):
+@st.cache_data(ttl=86400, max_entries=128, show_spinner=False)
+def get_ndvi_series(
+    lon: float,
+    lat: float,
+    buffer_km: float,
+    start_year: int = 2014,
+    end_year: int = 2024,
+):
     """
-    Create a 2014–2024 Landsat timelapse GIF for the ROI.
+    Cached NDVI series for (ROI centre, radius, year range).
 
-    Uses geemap.create_timelapse (your version doesn't like fps).
+    Only called when a persona actually renders the trend chart. Failures
+    propagate as exceptions, which st.cache_data doesn't cache.
     """
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+    return compute_ndvi_series(
+        roi, start_year, end_year, tiled=buffer_km > LARGE_ROI_KM
+    )
+
+
+def _fetch_true_color_frame(year: int, lon: float, lat: float, buffer_km: float):
+    """
+    Download one year's true-color composite as an RGB PNG frame (numpy array).
+    """
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+    url = get_true_color_year(year, lon, lat, buffer_km).getThumbURL(
+        {
+            "region": roi,
+            "dimensions": 512,
+            "format": "png",
+            "bands": ["SR_B4", "SR_B3", "SR_B2"],
+            "min": 0.0,
+            "max": 0.3,
+        }
+    )
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    frame = imageio.imread(response.content)
+    return frame[..., :3]  # drop the alpha channel outside the clipped ROI
+
+
+def _encode_frames(frames, suffix: str, write) -> bytes:
+    """
+    Encode frames via `write(path, frames)` into a private temp file and
+    return the file's bytes. The temp file is always removed.
+    """
+    fd, path = tempfile.mkstemp(prefix="terrtime_", suffix=suffix)
+    os.close(fd)
     try:
-        collection = (
-            ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
-            .filterDate("2014-01-01", "2024-12-31")
-            .filterBounds(roi)
-            .filter(ee.Filter.lt("CLOUD_COVER", 60))
-        )
+        write(path, frames)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def _write_mp4(path: str, frames):
+    """
+    H.264 MP4 at 2 fps (needs ffmpeg via imageio-ffmpeg).
+    """
+    with imageio.get_writer(path, fps=2, codec="libx264", quality=7) as writer:
+        for frame in frames:
+            writer.append_data(frame)
 
-        geemap_core.create_timelapse(
-            collection=collection,
-            start_date="2014-01-01",
-            end_date="2024-12-31",
-            region=roi,
-            bands=["SR_B4", "SR_B3", "SR_B2"],
-            frequency="year",
-            reducer="median",
-            vis_params={
-                "min": 5000,
-                "max": 15000,
-            },
-            out_gif=out_gif,
-        )
 
-        if os.path.exists(out_gif):
-            return out_gif
+def _write_gif(path: str, frames):
+    """
+    Looping GIF at 2 fps; the fallback when ffmpeg isn't available.
+    """
+    imageio.mimsave(path, frames, duration=500, loop=0)
+
+
+def create_timelapse(lon: float, lat: float, buffer_km: float):
+    """
+    Create a 2014–2024 Landsat timelapse video for the ROI.
+
+    Each frame is the yearly true-color composite, fetched as a PNG thumbnail
+    and encoded locally as H.264 MP4 (much smaller and faster to encode than a
+    GIF). Falls back to a GIF if ffmpeg isn't available. Years without imagery
+    are skipped.
+
+    Frames are independent, so they're downloaded in parallel.
+
+    Returns (bytes, mime type), or None if nothing could be generated.
+    Encoding goes through a per-call temp file that is deleted afterwards.
+    """
+    def fetch(year):
+        try:
+            return _fetch_true_color_frame(year, lon, lat, buffer_km)
+        except Exception as e:
+            print(f"Timelapse frame {year} error:", e)
+            return None
+
+    years = list(range(2014, 2025))
+    with ThreadPoolExecutor(max_workers=len(years)) as ex:
+        # fetch goes through the cached get_true_color_year, so the frame
+        # threads need the script context too.
+        frames = [f for f in ex.map(with_script_ctx(fetch), years) if f is not None]
+
+    if not frames:
         return None
+
+    try:
+        return _encode_frames(frames, ".mp4", _write_mp4), "video/mp4"
+    except Exception as e:
+        print("Timelapse MP4 error, falling back to GIF:", e)
+
+    try:
+        return _encode_frames(frames, ".gif", _write_gif), "image/gif"
     except Exception as e:
         print("Timelapse error:", e)
         return None
@@ -234,10 +603,15 @@ def build_health_map(ndvi_2014: ee.Image, ndvi_2024: ee.Image, roi: ee.Geometry)
     return styled
 
 
-def get_true_color_year(year: int, roi: ee.Geometry) -> ee.Image:
+@st.cache_resource(max_entries=128, show_spinner=False)
+def get_true_color_year(year: int, lon: float, lat: float, buffer_km: float) -> ee.Image:
     """
     Median Landsat 8 true-color composite for a given year over the ROI.
+
+    Memoized on (year, ROI centre, radius), like get_ndvi_image.
     """
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+
     start = ee.Date.fromYMD(year, 1, 1)
     end = ee.Date.fromYMD(year, 12, 31)
 
@@ -245,13 +619,133 @@ def get_true_color_year(year: int, roi: ee.Geometry) -> ee.Image:
         ee.ImageCollection("LANDSAT/LC08/C02/T1_L2")
         .filterDate(start, end)
         .filterBounds(roi)
-        .filter(ee.Filter.lt("CLOUD_COVER", 60))
+        .map(mask_landsat_clouds)
     )
 
     composite = collection.median().select(["SR_B4", "SR_B3", "SR_B2"]).clip(roi)
     return composite
 
 
+# --------------------------
+# Map rendering
+# --------------------------
+def _render_map_html(
+    lon: float,
+    lat: float,
+    buffer_km: float,
+    show_health: bool,
+    year_preview: int | None,
+    skip_failed_layers: bool,
+) -> str:
+    """
+    Build the satellite + health overlay map and return it as standalone HTML.
+
+    With `skip_failed_layers=False` any layer error is raised; otherwise the
+    failing layer is left out and the rest of the map is still drawn.
+    """
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+
+    Map = geemap.Map(center=[lat, lon], zoom=10)
+    Map.add_basemap("SATELLITE")
+
+    def try_layer(add):
+        try:
+            add()
+        except Exception:
+            if not skip_failed_layers:
+                raise
+
+    def add_true_color_2024():
+        tc_2024 = get_true_color_year(2024, lon, lat, buffer_km)
+        true_color_vis = {
+            "bands": ["SR_B4", "SR_B3", "SR_B2"],
+            "min": 0.0,
+            "max": 0.3,
+        }
+        Map.addLayer(tc_2024, true_color_vis, "Landsat True Color (2024)", True)
+
+    def add_true_color_preview():
+        tc_year = get_true_color_year(year_preview, lon, lat, buffer_km)
+        year_vis = {
+            "bands": ["SR_B4", "SR_B3", "SR_B2"],
+            "min": 0.0,
+            "max": 0.3,
+        }
+        Map.addLayer(
+            tc_year,
+            year_vis,
+            f"Landsat True Color ({year_preview})",
+            True,
+        )
+
+    def add_health_map():
+        health_map = build_health_map(
+            get_ndvi_image(2014, lon, lat, buffer_km),
+            get_ndvi_image(2024, lon, lat, buffer_km),
+            roi,
+        )
+        Map.addLayer(
+            health_map,
+            {},
+            "Vegetation Health (Red = Loss, Green = Gain)",
+            True,
+            opacity=0.4,
+        )
+
+    try_layer(add_true_color_2024)
+
+    if year_preview is not None and year_preview != 2024:
+        try_layer(add_true_color_preview)
+
+    roi_style = {"color": "yellow", "fillColor": "#00000000", "weight": 1}
+    Map.addLayer(roi, roi_style, "Analysis Area", True)
+
+    if show_health:
+        try_layer(add_health_map)
+
+    Map.centerObject(roi, 10)
+    return Map.to_html(height="600px")
+
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _cached_map_html(
+    lon: float,
+    lat: float,
+    buffer_km: float,
+    show_health: bool,
+    year_preview: int | None,
+) -> str:
+    """
+    Complete map HTML, cached per map settings so reruns don't rebuild the
+    folium map or re-request Earth Engine tile URLs. The TTL keeps us well
+    inside the lifetime of the EE tile tokens embedded in the HTML.
+
+    Layer errors propagate, so a map with a missing layer is never cached.
+    """
+    return _render_map_html(
+        lon, lat, buffer_km, show_health, year_preview, skip_failed_layers=False
+    )
+
+
+def build_map_html(
+    lon: float,
+    lat: float,
+    buffer_km: float,
+    show_health: bool,
+    year_preview: int | None,
+) -> str:
+    """
+    Map HTML for the audit: the cached complete map when every layer builds,
+    otherwise an uncached map without the failing layers.
+    """
+    try:
+        return _cached_map_html(lon, lat, buffer_km, show_health, year_preview)
+    except Exception:
+        return _render_map_html(
+            lon, lat, buffer_km, show_health, year_preview, skip_failed_layers=True
+        )
+
+
 # --------------------------
 # Splash screen
 # --------------------------
@@ -259,6 +753,8 @@ def splash_screen():
     """
     Splash screen:
     Centered title, subtitle, and button. No globe picture.
+
+    Returns the next stage when the button is clicked, else None.
     """
 
     st.markdown("<br><br><br>", unsafe_allow_html=True)
@@ -292,14 +788,18 @@ def splash_screen():
         )
 
         if st.button("✨ Choose your identity", use_container_width=True):
-            st.session_state["stage"] = "persona"
-            st.rerun()
+            return "persona"
+
+    return None
 
 
 # --------------------------
 # Persona selection screen
 # --------------------------
 def persona_screen():
+    """
+    Persona picker. Returns "app" once a persona is chosen, else None.
+    """
     # Bigger heading for "Who are you today?"
     st.markdown(
         """
@@ -326,8 +826,7 @@ def persona_screen():
         )
         if st.button("Use Scientist Mode"):
             st.session_state["persona"] = "scientist"
-            st.session_state["stage"] = "app"
-            st.rerun()
+            return "app"
 
     with col2:
         st.markdown("### 🎓 Student")
@@ -338,8 +837,7 @@ def persona_screen():
         )
         if st.button("Use Student Mode"):
             st.session_state["persona"] = "student"
-            st.session_state["stage"] = "app"
-            st.rerun()
+            return "app"
 
     with col3:
         st.markdown("### 🌱 Public")
@@ -350,21 +848,27 @@ def persona_screen():
         )
         if st.button("Use Public Mode"):
             st.session_state["persona"] = "public"
-            st.session_state["stage"] = "app"
-            st.rerun()
+            return "app"
+
+    return None
 
 
 # --------------------------
 # Sidebar per persona (ONLY type location now)
 # --------------------------
 def render_sidebar(persona: str):
-    with st.sidebar:
+    """
+    Draw the sidebar controls and return them, or None if the user asked to
+    change identity (the sidebar is cleared in that case).
+    """
+    panel = st.sidebar.empty()
+    with panel.container():
         st.title("TerraTime")
         st.markdown(f"**Mode:** `{persona.capitalize()}`")
 
         if st.button("← Change identity"):
-            st.session_state["stage"] = "persona"
-            st.rerun()
+            panel.empty()
+            return None
 
         if persona == "scientist":
             st.caption("Scientist mode: full detail, extra charts, technical copy.")
@@ -373,24 +877,40 @@ def render_sidebar(persona: str):
         else:
             st.caption("Public mode: simple wording, but real controls.")
 
-        # Only "Type location" – drop-pin removed
-        search_query = st.text_input(
-            "Location",
-            value="",
-            key="location_input",
-            placeholder="Type a city, address, or landmark…",
-            help="Type at least 3 characters to get suggestions.",
-        )
-
+        # Only "Type location" – drop-pin removed.
+        # Inside a form the text box doesn't rerun the script per keystroke;
+        # Nominatim is only queried when the user presses Enter / Search.
+        # Run Audit submits the same form, so typed text is always committed
+        # before an audit, even without pressing Search first.
+        with st.form("geo", clear_on_submit=False):
+            search_query = st.text_input(
+                "Location",
+                value="",
+                key="location_input",
+                placeholder="Type a city, address, or landmark…",
+                help="Type at least 3 characters, then press Search to get suggestions.",
+            )
+            searched = st.form_submit_button("Search")
+            run_audit = st.form_submit_button("Run Audit")
+
+        # Suggestions (with their coordinates) are kept in session_state so
+        # later reruns (radio clicks, sliders) reuse them. Every Search press
+        # looks up again; _cached_osm_suggestions already dedups successful
+        # lookups, and a failed one can simply be retried.
+        if searched:
+            st.session_state["suggestions"] = get_osm_suggestions(search_query.strip())
+            st.session_state["suggestions_for"] = search_query.strip()
+
+        # Suggestions from an earlier query don't apply once the text changed
+        # (e.g. new text submitted straight through Run Audit).
         suggestions = []
-        suggestion_labels = []
-        if search_query.strip() and len(search_query.strip()) >= 3:
-            suggestions = get_osm_suggestions(search_query.strip())
-            suggestion_labels = [s.address for s in suggestions]
-
-        selected_label = None
-        if suggestion_labels:
-            options = ["Use exactly what I typed"] + suggestion_labels
+        if st.session_state.get("suggestions_for") == search_query.strip():
+            suggestions = st.session_state.get("suggestions", [])
+
+        selected_location = None
+        if suggestions:
+            by_label = {s["display_name"]: s for s in suggestions}
+            options = ["Use exactly what I typed"] + list(by_label)
             choice = st.radio(
                 "Suggestions",
                 options=options,
@@ -398,9 +918,11 @@ def render_sidebar(persona: str):
                 help="Pick a match, or keep the first option to use your own text.",
             )
             if choice != "Use exactly what I typed":
-                selected_label = choice
+                selected_location = by_label[choice]
 
-        address = search_query if selected_label is None else selected_label
+        address = (
+            search_query if selected_location is None else selected_location["display_name"]
+        )
 
         # Persona-specific sliders
         year_preview = None
@@ -468,9 +990,7 @@ def render_sidebar(persona: str):
             if year_option != "(No specific year)":
                 year_preview = int(year_option)
 
-        run_audit = st.button("Run Audit")
-
-    return address, buffer_km, show_health, year_preview, run_audit
+    return address, selected_location, buffer_km, show_health, year_preview, run_audit
 
 
 # --------------------------
@@ -485,9 +1005,8 @@ def render_report(
     green_score_2014: float,
     green_score_2024: float,
     pct_change: float,
-    gif_path: str | None,
-    ndvi_years,
-    ndvi_values,
+    lon: float,
+    lat: float,
 ):
     st.subheader("Audit Report")
 
@@ -551,20 +1070,37 @@ Lower scores = more concrete, bare soil, or degraded land.
 
 **Notes:**
 
-- Clouds are filtered using `CLOUD_COVER < 60` and median compositing at 30 m.
+- Clouds and cloud shadows are masked per pixel from `QA_PIXEL`, then median-composited at 30 m.
 - Green Score is an affine transform of NDVI: `(NDVI + 1) / 2 * 100`.
 - Timelapse frames use yearly median composites with the same collection.
 """
         )
 
-    if persona in ("scientist", "student") and ndvi_years and any(v is not None for v in ndvi_values):
+    ndvi_years, ndvi_values = [], []
+    if persona in ("scientist", "student"):
+        with st.spinner("Loading NDVI trend..."):
+            try:
+                ndvi_years, ndvi_values = get_ndvi_series(lon, lat, buffer_km, 2014, 2024)
+            except Exception:
+                ndvi_years, ndvi_values = [], []
+
+    # Missing years become NaN, which st.line_chart leaves as gaps.
+    ndvi_arr = np.fromiter(
+        (np.nan if v is None else v for v in ndvi_values),
+        dtype=np.float64,
+        count=len(ndvi_values),
+    )
+
+    if ndvi_years and np.isfinite(ndvi_arr).any():
         st.markdown("---")
         st.subheader("NDVI trend (2014–2024)")
 
-        chart_data = {
-            "year": ndvi_years,
-            "mean_ndvi": [v if v is not None else None for v in ndvi_values],
-        }
+        chart_data = pd.DataFrame(
+            {
+                "year": ndvi_years,
+                "mean_ndvi": ndvi_arr,
+            }
+        )
 
         st.line_chart(
             data=chart_data,
@@ -572,25 +1108,40 @@ Lower scores = more concrete, bare soil, or degraded land.
             y="mean_ndvi",
         )
 
+
+# --------------------------
+# Timelapse rendering
+# --------------------------
+def render_timelapse(timelapse: tuple[bytes, str] | None):
+    """
+    Show the timelapse (bytes, mime type) with a download button, or a
+    warning if it couldn't be generated.
+    """
     st.markdown("---")
     st.subheader("10-Year Satellite Timelapse (2014–2024)")
 
-    if gif_path and os.path.exists(gif_path):
-        with open(gif_path, "rb") as f:
-            gif_bytes = f.read()
+    if timelapse is not None:
+        timelapse_bytes, mime = timelapse
 
-        if st.button("▶ View Timelapse GIF"):
+        is_video = mime == "video/mp4"
+        if is_video:
+            st.video(timelapse_bytes, format=mime)
+        else:
             st.image(
-                gif_bytes,
+                timelapse_bytes,
                 caption="Landsat Timelapse – TerraTime Audit Window (2014–2024)",
                 use_column_width=True,
             )
 
         st.download_button(
-            label="⬇ Download Timelapse GIF",
-            data=gif_bytes,
-            file_name="terrtime_2014_2024_timelapse.gif",
-            mime="image/gif",
+            label="⬇ Download Timelapse",
+            data=timelapse_bytes,
+            file_name=(
+                "terrtime_2014_2024_timelapse.mp4"
+                if is_video
+                else "terrtime_2014_2024_timelapse.gif"
+            ),
+            mime=mime,
         )
     else:
         st.warning(
@@ -600,13 +1151,86 @@ Lower scores = more concrete, bare soil, or degraded land.
         )
 
 
+# --------------------------
+# Audit pipeline
+# --------------------------
+async def _none():
+    """
+    Placeholder stage for asyncio.gather when a stage is skipped.
+    """
+    return None
+
+
+async def run_audit(
+    persona: str,
+    lon: float,
+    lat: float,
+    buffer_km: float,
+    show_health: bool,
+    year_preview: int | None,
+):
+    """
+    Run the independent audit stages concurrently on the shared executor.
+
+    NDVI stats, the NDVI series (Scientist/Student only) and the map HTML are
+    all blocking Earth Engine work, so they take about as long as the slowest
+    of them instead of their sum. The series result isn't returned: fetching
+    it here warms the get_ndvi_series cache that render_report reads from.
+    The timelapse is not part of this; see app_screen.
+
+    Returns (stats, map_html).
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_executor()
+
+    def in_pool(fn, *args, **kwargs):
+        return loop.run_in_executor(pool, partial(with_script_ctx(fn), *args, **kwargs))
+
+    roi = create_roi(lon, lat, buffer_km=buffer_km)
+
+    # Stack both years as bands so one reduceRegion returns both means.
+    ndvi_2014 = get_ndvi_image(2014, lon, lat, buffer_km)
+    ndvi_2024 = get_ndvi_image(2024, lon, lat, buffer_km)
+    combined = ndvi_2014.rename("n14").addBands(ndvi_2024.rename("n24"))
+
+    stats_task = in_pool(
+        compute_mean_ndvi,
+        combined,
+        roi,
+        tiled=buffer_km > LARGE_ROI_KM,
+        bands=["n14", "n24"],
+    )
+    map_task = in_pool(build_map_html, lon, lat, buffer_km, show_health, year_preview)
+
+    def warm_series():
+        # A failed series only hides the chart; it mustn't fail the audit.
+        try:
+            get_ndvi_series(lon, lat, buffer_km, 2014, 2024)
+        except Exception:
+            pass
+
+    if persona in ("scientist", "student"):
+        series_task = in_pool(warm_series)
+    else:
+        series_task = _none()
+
+    stats, map_html, _ = await asyncio.gather(stats_task, map_task, series_task)
+    return stats or {}, map_html
+
+
 # --------------------------
 # Main app (persona = scientist/student/public)
 # --------------------------
 def app_screen(persona: str):
+    """
+    Main audit screen. Returns "persona" if the user switches identity.
+    """
     initialize_earth_engine()
 
-    address, buffer_km, show_health, year_preview, run_audit = render_sidebar(persona)
+    controls = render_sidebar(persona)
+    if controls is None:
+        return "persona"
+    address, selected_location, buffer_km, show_health, year_preview, run_audit = controls
 
     st.title("🌍 TerraTime: The AI Earth Auditor")
     if persona == "scientist":
@@ -625,40 +1249,62 @@ def app_screen(persona: str):
             st.error("Please enter a valid location string.")
             return
 
-        try:
-            location = geocode_location(address)
-        except Exception as e:
-            st.error(f"Geocoding failed: {e}")
-            return
+        # A picked suggestion already carries its coordinates; only free text
+        # needs another Nominatim lookup.
+        if selected_location is not None:
+            location = selected_location
+        else:
+            try:
+                location = geocode_location(address)
+            except Exception as e:
+                st.error(f"Geocoding failed: {e}")
+                return
 
         if location is None:
             st.error("Could not find that location. Try a more specific address or another place.")
             return
 
-        lat = location.latitude
-        lon = location.longitude
-
-        roi = create_roi(lon, lat, buffer_km=buffer_km)
+        # Coordinates are already on the COORD_DECIMALS grid; round the radius
+        # too so the memoized imagery helpers get stable cache keys.
+        lat = location["lat"]
+        lon = location["lon"]
+        buffer_km = round(buffer_km, 2)
+
+        # The timelapse is the slowest step. Start it now on its own pool so
+        # it overlaps with the stats and map, and collect it only after the
+        # rest of the audit is on screen.
+        timelapse_future = get_timelapse_executor().submit(
+            with_script_ctx(create_timelapse), lon, lat, buffer_km
+        )
 
         try:
-            ndvi_2014 = get_ndvi_image(2014, roi)
-            ndvi_2024 = get_ndvi_image(2024, roi)
-
-            mean_ndvi_2014 = compute_mean_ndvi(ndvi_2014, roi)
-            mean_ndvi_2024 = compute_mean_ndvi(ndvi_2024, roi)
+            stats, map_html = asyncio.run(
+                run_audit(
+                    persona,
+                    lon,
+                    lat,
+                    buffer_km,
+                    show_health,
+                    year_preview,
+                )
+            )
+            mean_ndvi_2014 = stats.get("n14")
+            mean_ndvi_2024 = stats.get("n24")
         except Exception as e:
+            timelapse_future.cancel()
             st.error(f"Error computing NDVI statistics from Earth Engine: {e}")
             return
 
         if (mean_ndvi_2014 is None) or (mean_ndvi_2024 is None):
+            timelapse_future.cancel()
             st.error(
                 "Could not compute vegetation stats for this area. "
                 "Try a slightly larger radius or a different location."
             )
             return
 
-        green_score_2014 = (mean_ndvi_2014 + 1) / 2 * 100
-        green_score_2024 = (mean_ndvi_2024 + 1) / 2 * 100
+        ndvi_pair = np.array([mean_ndvi_2014, mean_ndvi_2024], dtype=np.float64)
+        green_score_2014, green_score_2024 = ndvi_to_green_score(ndvi_pair)
 
         if mean_ndvi_2014 != 0:
             ndvi_change = mean_ndvi_2024 - mean_ndvi_2014
@@ -666,68 +1312,8 @@ def app_screen(persona: str):
         else:
             pct_change = 0.0
 
-        # OPTIMIZATION: Skip time series to load faster (2-5 min -> < 30 sec)
-        # Uncomment below to enable NDVI trend chart (will be slow)
-        ndvi_years, ndvi_values = ([], [])
-        # if persona in ("scientist", "student"):
-        #     ndvi_years, ndvi_values = compute_ndvi_series(roi, 2014, 2024)
-
-        Map = geemap.Map(center=[lat, lon], zoom=10)
-        Map.add_basemap("SATELLITE")
-
-        try:
-            tc_2024 = get_true_color_year(2024, roi)
-            true_color_vis = {
-                "bands": ["SR_B4", "SR_B3", "SR_B2"],
-                "min": 5000,
-                "max": 15000,
-            }
-            Map.addLayer(tc_2024, true_color_vis, "Landsat True Color (2024)", True)
-        except Exception:
-            pass
-
-        if year_preview is not None and year_preview != 2024:
-            try:
-                tc_year = get_true_color_year(year_preview, roi)
-                year_vis = {
-                    "bands": ["SR_B4", "SR_B3", "SR_B2"],
-                    "min": 5000,
-                    "max": 15000,
-                }
-                Map.addLayer(
-                    tc_year,
-                    year_vis,
-                    f"Landsat True Color ({year_preview})",
-                    True,
-                )
-            except Exception:
-                pass
-
-        roi_style = {"color": "yellow", "fillColor": "#00000000", "weight": 1}
-        Map.addLayer(roi, roi_style, "Analysis Area", True)
-
-        if show_health:
-            try:
-                health_map = build_health_map(ndvi_2014, ndvi_2024, roi)
-                Map.addLayer(
-                    health_map,
-                    {},
-                    "Vegetation Health (Red = Loss, Green = Gain)",
-                    True,
-                    opacity=0.4,
-                )
-            except Exception:
-                pass
-
-        Map.centerObject(roi, 10)
-
-        # OPTIMIZATION: Skip GIF generation (very slow + not working reliably)
-        # Uncomment below to enable timelapse GIF (adds 1-2 minutes)
-        gif_path = None
-        # gif_path = create_timelapse_gif(roi, out_gif="terrtime_timelapse.gif")
-
     st.subheader("Map & Health Overlay")
-    Map.to_streamlit(height=600)
+    components.html(map_html, height=600)
 
     render_report(
         persona,
@@ -738,15 +1324,39 @@ def app_screen(persona: str):
         green_score_2014,
         green_score_2024,
         pct_change,
-        gif_path,
-        ndvi_years,
-        ndvi_values,
+        lon,
+        lat,
     )
 
+    with st.spinner("Finishing timelapse..."):
+        try:
+            timelapse = timelapse_future.result(timeout=120)
+        except FutureTimeoutError:
+            # Still queued jobs are dropped; a running one can't be stopped.
+            timelapse_future.cancel()
+            timelapse = None
+
+    render_timelapse(timelapse)
+
 
 # --------------------------
 # Main entry
 # --------------------------
+def dispatch(stage: str):
+    """
+    Render the screen for `stage` and return the stage to switch to, if any.
+    """
+    if stage == "splash":
+        return splash_screen()
+    if stage == "persona":
+        return persona_screen()
+
+    persona = st.session_state.get("persona", None)
+    if not persona:
+        return "persona"
+    return app_screen(persona)
+
+
 def main():
     st.set_page_config(
         page_title="TerraTime: The AI Earth Auditor",
@@ -758,18 +1368,18 @@ def main():
     if "stage" not in st.session_state:
         st.session_state["stage"] = "splash"
 
+    # Screens return the next stage instead of calling st.rerun(), and we
+    # render it straight away in the same pass. Each screen draws into the
+    # same placeholder, so the previous one is replaced.
+    screen = st.empty()
     stage = st.session_state["stage"]
-    persona = st.session_state.get("persona", None)
-
-    if stage == "splash":
-        splash_screen()
-    elif stage == "persona":
-        persona_screen()
-    else:
-        if not persona:
-            st.session_state["stage"] = "persona"
-            st.rerun()
-        app_screen(persona)
+    while True:
+        with screen.container():
+            next_stage = dispatch(stage)
+        if next_stage is None:
+            break
+        stage = next_stage
+        st.session_state["stage"] = stage
 
 
 if __name__ == "__main__":